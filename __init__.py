@@ -2,12 +2,23 @@
 from __future__ import annotations
 
 import time
-from datetime import datetime, timedelta
+from datetime import date, datetime
 from typing import Optional
 
 from aqt import mw, gui_hooks
 from aqt.utils import tooltip
-from aqt.qt import QTimer, QMessageBox, QAction, qconnect, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QSpinBox, QCheckBox, QPushButton, QComboBox
+from aqt.qt import Qt, QTimer, QMessageBox, QAction, qconnect, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QSpinBox, QCheckBox, QPushButton, QComboBox
+
+# Resolve the Win32 focus helpers once; None on other platforms
+try:
+    import ctypes
+    _user32 = ctypes.windll.user32
+    _ShowWindow = _user32.ShowWindow
+    _ShowWindow.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    _SetForegroundWindow = _user32.SetForegroundWindow
+    _SetForegroundWindow.argtypes = [ctypes.c_void_p]
+except Exception:
+    _user32 = None
 
 def _format_interval(minutes: float) -> str:
     """Format interval in a human-readable way"""
@@ -33,24 +44,27 @@ def _get_addon_name() -> str:
     interval_display = _format_interval(interval_minutes)
     return f"Forced Review Every {interval_display}"
 
+# QTimer doesn't count time spent suspended, so never sleep longer than this
+# towards a wall-clock target (quiet-hours end, midnight); re-check instead
+MAX_WALL_CLOCK_WAIT_S = 30 * 60
+
 DEFAULT_CFG = {
     "interval_minutes": 30,
     "snooze_minutes": 5,
     "quiet_hours": {"start": 25, "end": 26},  # Never quiet (invalid hours)
     "enabled": True,
     "target_deck_id": None,
+    "disable_until_date": None,  # "YYYY-MM-DD" set by "Disable for Today"
 }
 
 def get_cfg():
-    cfg = mw.addonManager.getConfig(__name__) or {}
-    # fill missing keys with defaults
-    merged = DEFAULT_CFG.copy()
-    merged.update(cfg)
-    if "quiet_hours" not in merged:
-        merged["quiet_hours"] = DEFAULT_CFG["quiet_hours"]
-    if "target_deck_id" not in merged:
-        merged["target_deck_id"] = None
-    return merged
+    # fill missing keys with defaults; copy the nested dict so callers can't
+    # mutate DEFAULT_CFG through it
+    return {
+        **DEFAULT_CFG,
+        "quiet_hours": dict(DEFAULT_CFG["quiet_hours"]),
+        **(mw.addonManager.getConfig(__name__) or {}),
+    }
 
 def set_cfg(cfg):
     mw.addonManager.writeConfig(__name__, cfg)
@@ -59,92 +73,167 @@ class ReviewNudger:
     def __init__(self):
         self.cfg = get_cfg()
         self.timer = QTimer(mw)
-        self.timer.setSingleShot(False)
+        # Coarse accuracy is plenty for minute-scale nudges and avoids
+        # bumping the system-wide timer resolution
+        self.timer.setTimerType(Qt.TimerType.CoarseTimer)
+        self.timer.setSingleShot(True)
         self.timer.timeout.connect(self._on_tick)
-        self._last_activity_ts: float = time.time()
-        self._disable_until_date: Optional[str] = None  # "YYYY-MM-DD"
-        self._next_due_ts: float = self._last_activity_ts + self._interval_s()
+        self._recompute_intervals()
+        self._last_activity_ts: float = time.monotonic()  # monotonic clock
+        self._disable_until_date: Optional[int] = None  # date ordinal
+        # "Disable for Today" survives a restart via the config
+        try:
+            disabled_on = self.cfg.get("disable_until_date")
+            if disabled_on:
+                self._disable_until_date = datetime.strptime(disabled_on, "%Y-%m-%d").toordinal()
+        except Exception:
+            pass
+        self._reschedule_pending: bool = False
+        self._deck_pairs_cache: Optional[list] = None
+        self._next_due_ts: float = self._last_activity_ts + self._interval_s_val
         self._install_menu()
 
         gui_hooks.profile_did_open.append(self._on_profile_open)
         gui_hooks.reviewer_did_answer_card.append(self._on_answer_card)
         gui_hooks.state_did_change.append(self._on_state_change)
+        # deck list may have changed (add/rename/delete, or a sync)
+        gui_hooks.operation_did_execute.append(self._on_operation_did_execute)
+        gui_hooks.sync_did_finish.append(self._invalidate_deck_pairs)
 
         # start after profile is ready
         self._start_timer()
 
-    def _interval_s(self) -> int:
-        return int(self.cfg.get("interval_minutes", 30) * 60)
-
-    def _snooze_s(self) -> int:
-        return int(self.cfg.get("snooze_minutes", 5) * 60)
-
-    def _is_quiet_now(self) -> bool:
+    def _recompute_intervals(self):
+        """Cache config-derived values; call again whenever self.cfg changes."""
+        # at least 1s so a zero/garbage value can't spin the timer
+        self._interval_s_val: int = max(1, int(self.cfg.get("interval_minutes", 30) * 60))
+        self._snooze_s_val: int = max(1, int(self.cfg.get("snooze_minutes", 5) * 60))
+        self._snooze_label: str = _format_interval(self._snooze_s_val / 60)
         q = self.cfg.get("quiet_hours", {"start": 25, "end": 26})
         try:
-            start, end = int(q["start"]), int(q["end"]) 
+            start, end = int(q["start"]), int(q["end"])
         except Exception:
+            start, end = 25, 26
+        self._qh_start: int = start
+        self._qh_end: int = end
+        # Treat invalid hours (outside 0-23) or same hour as disabled
+        self._qh_enabled: bool = 0 <= start <= 23 and 0 <= end <= 23 and start != end
+
+    def _is_quiet_now(self) -> bool:
+        if not self._qh_enabled:
             return False
-        # Treat invalid hours (outside 0-23) as disabled
-        if not (0 <= start <= 23 and 0 <= end <= 23):
-            return False
-        now_h = datetime.now().hour
-        if start == end:
-            # same hour -> disabled
-            return False
-        if start < end:
-            return start <= now_h < end
+        now_h = time.localtime().tm_hour
+        if self._qh_start < self._qh_end:
+            return self._qh_start <= now_h < self._qh_end
         else:
             # overnight wrap (e.g., 22–7)
-            return now_h >= start or now_h < end
+            return now_h >= self._qh_start or now_h < self._qh_end
+
+    def _next_quiet_end_ts(self) -> Optional[float]:
+        """Epoch seconds at which the current/next quiet window ends."""
+        if not self._qh_enabled:
+            return None
+        now = datetime.now()
+        end_dt = datetime.fromordinal(now.toordinal()).replace(hour=self._qh_end)
+        if end_dt <= now:
+            end_dt = datetime.fromordinal(now.toordinal() + 1).replace(hour=self._qh_end)
+        return end_dt.timestamp()
+
+    def _next_midnight_ts(self) -> float:
+        return datetime.fromordinal(self._today_ord() + 1).timestamp()
 
-    def _today_str(self) -> str:
-        return datetime.now().strftime("%Y-%m-%d")
+    def _today_ord(self) -> int:
+        return datetime.now().toordinal()
 
     # ---------------- Hooks & events ----------------
 
     def _on_profile_open(self):
-        self._last_activity_ts = time.time()
-        self._next_due_ts = self._last_activity_ts + self._interval_s()
+        self._invalidate_deck_pairs()
+        self._mark_activity()
 
     def _on_answer_card(self, *args, **kwargs):
         # Any answered card = active reviewing → reset timer
-        self._last_activity_ts = time.time()
-        self._next_due_ts = self._last_activity_ts + self._interval_s()
+        self._mark_activity()
 
     def _on_state_change(self, new_state: str, old_state: str):
         # If you just started/stopped reviewing, keep the timer healthy
         if new_state == "review":
-            self._last_activity_ts = time.time()
-            self._next_due_ts = self._last_activity_ts + self._interval_s()
+            self._mark_activity()
+        elif old_state == "review":
+            # ticks during review were deferred; re-arm so an overdue prompt
+            # shows up right after leaving the reviewer
+            self._schedule_next()
+
+    def _mark_activity(self):
+        # Record activity now, but coalesce bursts (e.g. answering many cards
+        # quickly) into a single timer re-arm
+        self._last_activity_ts = time.monotonic()
+        if not self._reschedule_pending:
+            self._reschedule_pending = True
+            QTimer.singleShot(500, Qt.TimerType.CoarseTimer, self._flush_reschedule)
+
+    def _flush_reschedule(self):
+        self._reschedule_pending = False
+        self._next_due_ts = self._last_activity_ts + self._interval_s_val
+        self._schedule_next()
+
+    def _on_operation_did_execute(self, changes, handler):
+        # fires for deck add/rename/delete from any window (browser, add dialog, ...)
+        if getattr(changes, "deck", False):
+            self._invalidate_deck_pairs()
+
+    def _invalidate_deck_pairs(self, *args, **kwargs):
+        self._deck_pairs_cache = None
 
     # ---------------- Timer logic ----------------
 
     def _start_timer(self):
-        self.timer.start(1000 * 15)  # check every 15s
+        self._schedule_next()
+
+    def _schedule_next(self, delay_s: Optional[float] = None):
+        """Arm the single-shot timer for the next due time (or an explicit delay)."""
+        if not self.cfg.get("enabled", True):
+            self.timer.stop()
+            return
+        if delay_s is None:
+            delay_s = self._next_due_ts - time.monotonic()
+        # QTimer.start() restarts an active timer, so re-arming is always safe
+        self.timer.start(int(max(1000, delay_s * 1000)))
+
+    def _schedule_wall_clock(self, target_ts: float):
+        """Sleep towards a wall-clock time, capped so a suspend/resume can't delay us."""
+        self._schedule_next(min(target_ts - time.time(), MAX_WALL_CLOCK_WAIT_S))
 
     def _on_tick(self):
         if not self.cfg.get("enabled", True):
             return
-        # Respect "disable today"
-        if self._disable_until_date == self._today_str():
+        # Respect "disable today": sleep until local midnight
+        if self._disable_until_date == self._today_ord():
+            self._schedule_wall_clock(self._next_midnight_ts())
             return
-        # Respect quiet hours
+        # Respect quiet hours: sleep until they end
         if self._is_quiet_now():
+            quiet_end = self._next_quiet_end_ts()
+            if quiet_end is not None:
+                self._schedule_wall_clock(quiet_end)
             return
-        # Already in reviewer? Keep silent.
+        # Already in reviewer? Keep silent and check again after an interval.
         if mw.state == "review":
+            self._schedule_next(self._interval_s_val)
             return
-        now = time.time()
+        now = time.monotonic()
         if now >= self._next_due_ts:
             self._prompt_review()
+        else:
+            # woke up early (e.g. coarse timer slack) → sleep the remainder
+            self._schedule_next()
 
     # ---------------- UI actions ----------------
 
     def _bring_to_front(self):
         """Try to bring the Anki main window to the foreground and give it focus."""
         try:
-            from aqt.qt import Qt, QGuiApplication, QTimer as _QTimer
+            from aqt.qt import QGuiApplication
             # Restore if minimized and request activation
             mw.showNormal()
             try:
@@ -163,21 +252,18 @@ class ReviewNudger:
                 pass
             # Windows-specific nudge to the foreground (best effort)
             try:
-                import sys
-                if sys.platform.startswith("win"):
-                    import ctypes
-                    user32 = ctypes.windll.user32
+                if _user32 is not None:
                     SW_RESTORE = 9
                     hwnd = int(mw.winId())
-                    user32.ShowWindow(hwnd, SW_RESTORE)
-                    user32.SetForegroundWindow(hwnd)
+                    _ShowWindow(hwnd, SW_RESTORE)
+                    _SetForegroundWindow(hwnd)
             except Exception:
                 pass
             # Ensure on top briefly to defeat focus stealing prevention
             try:
                 mw.setWindowFlag(Qt.WindowType.WindowStaysOnTopHint, True)
                 mw.show()
-                _QTimer.singleShot(400, lambda: (mw.setWindowFlag(Qt.WindowType.WindowStaysOnTopHint, False), mw.show()))
+                QTimer.singleShot(400, Qt.TimerType.CoarseTimer, lambda: (mw.setWindowFlag(Qt.WindowType.WindowStaysOnTopHint, False), mw.show()))
             except Exception:
                 pass
         except Exception:
@@ -188,10 +274,10 @@ class ReviewNudger:
         self._bring_to_front()
         # Blocking dialog with choices
         msg = QMessageBox(mw)
-        msg.setWindowTitle(ADDON_NAME)
+        msg.setWindowTitle(_get_addon_name())
         msg.setText("Time to review! Do you want to start now?")
         start_btn = msg.addButton("Start Review", QMessageBox.ButtonRole.AcceptRole)
-        snooze_btn = msg.addButton(f"Snooze {self.cfg.get('snooze_minutes', 5)}m", QMessageBox.ButtonRole.ActionRole)
+        snooze_btn = msg.addButton(f"Snooze {self._snooze_label}", QMessageBox.ButtonRole.ActionRole)
         disable_btn = msg.addButton("Disable for Today", QMessageBox.ButtonRole.DestructiveRole)
         cancel_btn = msg.addButton("Cancel", QMessageBox.ButtonRole.RejectRole)
         msg.setIcon(QMessageBox.Icon.Information)
@@ -201,17 +287,22 @@ class ReviewNudger:
         if clicked == start_btn:
             self._start_review()
             # next reminder after a full interval
-            self._last_activity_ts = time.time()
-            self._next_due_ts = self._last_activity_ts + self._interval_s()
+            self._last_activity_ts = time.monotonic()
+            self._next_due_ts = self._last_activity_ts + self._interval_s_val
         elif clicked == snooze_btn:
-            self._next_due_ts = time.time() + self._snooze_s()
-            tooltip(f"Snoozed for {self.cfg.get('snooze_minutes', 5)} minutes")
+            self._next_due_ts = time.monotonic() + self._snooze_s_val
+            tooltip(f"Snoozed for {self._snooze_label}")
         elif clicked == disable_btn:
-            self._disable_until_date = self._today_str()
+            # one clock read so the in-memory and persisted day always agree
+            today = self._today_ord()
+            self._disable_until_date = today
+            self.cfg["disable_until_date"] = date.fromordinal(today).isoformat()
+            set_cfg(self.cfg)
             tooltip("Disabled for today")
         else:
             # Cancel: remind again in 2 minutes (short nudge)
-            self._next_due_ts = time.time() + 120
+            self._next_due_ts = time.monotonic() + 120
+        self._schedule_next()
 
     def _start_review(self):
         # Navigate Overview → start study. Works on modern Anki builds.
@@ -224,32 +315,98 @@ class ReviewNudger:
                         mw.col.decks.select(int(target_id))
                     except Exception:
                         try:
-                            d = mw.col.decks.get(int(target_id))
-                            if d:
-                                did = d.get("id") or d.get("did")
-                            else:
+                            if not mw.col.decks.get(int(target_id)):
                                 tooltip("Configured deck not found; using current deck")
                         except Exception:
                             tooltip("Configured deck not found; using current deck")
             except Exception:
                 pass
-            # jump to overview for current deck
-            mw.onOverview()
-            # after overview is built, call onStudy()
-            from aqt.qt import QTimer as _QTimer
+            # once the overview is shown, call onStudy() (no polling)
+            handled = False
+
+            def _on_state(new_state: str, old_state: str):
+                nonlocal handled
+                if new_state != "overview" or handled:
+                    return
+                handled = True
+                # defer so we don't change state while the hook is dispatching
+                QTimer.singleShot(0, _try_start)
+
             def _try_start():
+                gui_hooks.state_did_change.remove(_on_state)
                 try:
-                    # overview may not be ready immediately
-                    if getattr(mw, "overview", None) and hasattr(mw.overview, "onStudy"):
-                        mw.overview.onStudy()
-                    else:
-                        _QTimer.singleShot(100, _try_start)
+                    mw.overview.onStudy()
                 except Exception:
                     # fallback: just show a tooltip
                     tooltip("Could not start review automatically. Open your deck to begin.")
-            _QTimer.singleShot(100, _try_start)
+
+            def _give_up():
+                # overview never showed up; stop waiting for it
+                nonlocal handled
+                if not handled:
+                    handled = True
+                    gui_hooks.state_did_change.remove(_on_state)
+                    tooltip("Could not start review automatically. Open your deck to begin.")
+
+            gui_hooks.state_did_change.append(_on_state)
+            QTimer.singleShot(2000, Qt.TimerType.CoarseTimer, _give_up)
+            # jump to overview for current deck
+            mw.onOverview()
         mw.taskman.run_on_main(go)
 
+    def _load_deck_pairs(self) -> list:
+        """Enumerate (name, deck_id) pairs for the settings dialog and cache them."""
+        pairs = []
+        try:
+            # Try modern API: list of objects/tuples
+            an = getattr(mw.col.decks, "all_names_and_ids", None)
+            if callable(an):
+                an_list = an()
+                # an_list may be list of NamedTuples or tuples
+                for entry in an_list:
+                    try:
+                        name = entry.name
+                        did = int(entry.id)
+                    except Exception:
+                        try:
+                            name, did = entry
+                            did = int(did)
+                        except Exception:
+                            continue
+                    if name:
+                        pairs.append((name, did))
+            else:
+                # Fallback to .all()
+                for d in mw.col.decks.all():
+                    try:
+                        name = d.get("name")
+                        did = d.get("id") or d.get("did") or d.get("deck_id")
+                        if name is not None and did is not None:
+                            pairs.append((name, int(did)))
+                    except Exception:
+                        continue
+        except Exception:
+            pass
+        # de-dup by deck id (first name wins), then sort case-insensitively
+        seen: dict[int, str] = {}
+        for name, did in pairs:
+            seen.setdefault(did, name)
+        pairs = sorted(((n, d) for d, n in seen.items()), key=lambda x: x[0].casefold())
+        self._deck_pairs_cache = pairs
+        return pairs
+
+    def _apply_config(self, new_cfg: dict):
+        """Write and apply a new config in one pass: cache, schedule and menu label."""
+        self.cfg = new_cfg
+        set_cfg(new_cfg)
+        self._recompute_intervals()
+        # Reset schedule based on new interval
+        self._last_activity_ts = time.monotonic()
+        self._next_due_ts = self._last_activity_ts + self._interval_s_val
+        # Update snooze action label to reflect new minutes
+        self._snooze_action.setText(f"Forced Review: Snooze {self._snooze_label}")
+        self._schedule_next()
+
     def _open_settings(self):
         dlg = QDialog(mw)
         dlg.setWindowTitle(f"{_get_addon_name()} Settings")
@@ -314,40 +471,8 @@ class ReviewNudger:
         row5.addWidget(QLabel("Target deck:"))
         deck_combo = QComboBox(dlg)
         deck_combo.setMinimumWidth(240)
-        # Populate decks
-        pairs = []
-        try:
-            # Try modern API: list of objects/tuples
-            an = getattr(mw.col.decks, "all_names_and_ids", None)
-            if callable(an):
-                an_list = an()
-                # an_list may be list of NamedTuples or tuples
-                for entry in an_list:
-                    try:
-                        name = entry.name
-                        did = int(entry.id)
-                    except Exception:
-                        try:
-                            name, did = entry
-                            did = int(did)
-                        except Exception:
-                            continue
-                    if name:
-                        pairs.append((name, did))
-            else:
-                # Fallback to .all()
-                for d in mw.col.decks.all():
-                    try:
-                        name = d.get("name")
-                        did = d.get("id") or d.get("did") or d.get("deck_id")
-                        if name is not None and did is not None:
-                            pairs.append((name, int(did)))
-                    except Exception:
-                        continue
-        except Exception:
-            pass
-        pairs = list({(n, d) for (n, d) in pairs})  # de-dup
-        pairs.sort(key=lambda x: x[0].lower())
+        # Populate decks (cached until decks change)
+        pairs = self._deck_pairs_cache or self._load_deck_pairs()
         deck_combo.addItem("Use current deck", userData=None)
         for name, did in pairs:
             deck_combo.addItem(name, userData=did)
@@ -384,17 +509,7 @@ class ReviewNudger:
                 new_cfg["target_deck_id"] = int(sel) if sel is not None else None
             except Exception:
                 new_cfg["target_deck_id"] = None
-            set_cfg(new_cfg)
-            self.cfg = new_cfg
-            # Reset schedule based on new interval
-            self._last_activity_ts = time.time()
-            self._next_due_ts = self._last_activity_ts + self._interval_s()
-            # Update snooze action label to reflect new minutes
-            try:
-                if hasattr(self, "_snooze_action") and self._snooze_action is not None:
-                    self._snooze_action.setText(f"Forced Review: Snooze {int(self.cfg.get('snooze_minutes', 5))}m")
-            except Exception:
-                pass
+            self._apply_config(new_cfg)
             tooltip("Settings saved")
             dlg.accept()
 
@@ -419,11 +534,7 @@ class ReviewNudger:
         tools.addAction(toggle)
 
         # Snooze minutes reflect current config
-        try:
-            snooze_label = f"Forced Review: Snooze {int(self.cfg.get('snooze_minutes', 5))}m"
-        except Exception:
-            snooze_label = "Forced Review: Snooze"
-        self._snooze_action = QAction(snooze_label, mw)
+        self._snooze_action = QAction(f"Forced Review: Snooze {self._snooze_label}", mw)
         qconnect(self._snooze_action.triggered, self._quick_snooze)
         tools.addAction(self._snooze_action)
 
@@ -435,22 +546,39 @@ class ReviewNudger:
         self.cfg["enabled"] = not self.cfg.get("enabled", True)
         set_cfg(self.cfg)
         state = "ON" if self.cfg["enabled"] else "OFF"
+        # stops the timer when OFF, re-arms it when ON
+        self._schedule_next()
         tooltip(f"{_get_addon_name()} {state}")
 
     def _quick_snooze(self):
-        self._next_due_ts = time.time() + self._snooze_s()
-        tooltip(f"Snoozed for {self.cfg.get('snooze_minutes', 5)} minutes")
+        self._next_due_ts = time.monotonic() + self._snooze_s_val
+        self._schedule_next()
+        tooltip(f"Snoozed for {self._snooze_label}")
 
     def _reset_today(self):
         self._disable_until_date = None
-        self._last_activity_ts = time.time()
-        self._next_due_ts = self._last_activity_ts + self._interval_s()
+        if self.cfg.get("disable_until_date") is not None:
+            self.cfg["disable_until_date"] = None
+            set_cfg(self.cfg)
+        self._last_activity_ts = time.monotonic()
+        self._next_due_ts = self._last_activity_ts + self._interval_s_val
+        self._schedule_next()
         tooltip("Reset for today")
 
 # Initialize when profile opens
 def _init_after_profile():
     # Singleton
-    if not hasattr(mw, "_forced_review_nudger"):
-        mw._forced_review_nudger = ReviewNudger()
+    if hasattr(mw, "_forced_review_nudger"):
+        return
+
+    def _create():
+        if not hasattr(mw, "_forced_review_nudger"):
+            mw._forced_review_nudger = ReviewNudger()
+
+    # Build on the next event-loop turn so an error here can't abort profile load
+    QTimer.singleShot(0, _create)
 
-gui_hooks.profile_did_open.append(_init_after_profile)
+# Register once, even if this module gets loaded again (e.g. from a copy)
+if not getattr(mw, "_forced_review_registered", False):
+    gui_hooks.profile_did_open.append(_init_after_profile)
+    mw._forced_review_registered = True
@@ -0,0 +1,28 @@
+"""
+JSON helpers for the test scripts
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise. Both paths read bytes or str and write 2-space indented JSON.
+"""
+
+try:
+    import orjson as _oj
+
+    JSONDecodeError = _oj.JSONDecodeError
+    loads = _oj.loads
+
+    def dumps_bytes(obj) -> bytes:
+        return _oj.dumps(obj, option=_oj.OPT_INDENT_2)
+
+except ImportError:
+    import json as _j
+
+    JSONDecodeError = _j.JSONDecodeError
+    loads = _j.loads
+
+    def dumps_bytes(obj) -> bytes:
+        return _j.dumps(obj, indent=2).encode("utf-8")
+
+
+def dumps(obj) -> str:
+    return dumps_bytes(obj).decode("utf-8")
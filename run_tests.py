@@ -5,135 +5,207 @@ Automated Test Runner for Anki Review Nudger
 This script performs automated checks to verify the addon is working correctly.
 Run this while Anki is closed to check configuration and file integrity.
 
-Usage: python run_tests.py
+Usage: python run_tests.py [-v]
+
+  -v  print each result immediately instead of all at once at the end
 """
 
-import json
+import ast
 import os
+import re
 import sys
 from pathlib import Path
 import importlib.util
 
+from json_compat import JSONDecodeError, loads
+
+class PhaseResults(list):
+    """Records the output of one test phase for the runner to replay"""
+    
+    def test(self, name, condition, message=""):
+        self.append(("test", name, bool(condition), message))
+    
+    def info(self, message):
+        self.append(("info", message))
+    
+    def warning(self, message):
+        self.append(("warning", message))
+
+def _token_scanner(tokens):
+    """Compile literal tokens into one regex that finds all of them in one pass
+    
+    The lookahead tries every position, so overlapping occurrences are still
+    reported; at a single position only one alternative can win, which is
+    exact as long as no token contains another -- refuse such token sets.
+    """
+    tokens = list(tokens)
+    for a in tokens:
+        for b in tokens:
+            if a != b and a in b:
+                raise ValueError(f"Scan token {a!r} is contained in {b!r}")
+    return re.compile("(?=(" + "|".join(re.escape(t) for t in tokens) + "))")
+
+def _find_all(rx, content):
+    """Return the set of tokens of rx present in content (one pass)"""
+    return {m.group(1) for m in rx.finditer(content)}
+
 class TestRunner:
-    def __init__(self):
+    # Key components that must appear in __init__.py
+    MAIN_COMPONENTS = [
+        ("ReviewNudger class", "class ReviewNudger"),
+        ("Timer setup", "QTimer"),
+        ("Configuration handling", "get_cfg"),
+        ("Menu installation", "_install_menu"),
+        ("Hooks registration", "gui_hooks"),
+        ("Profile initialization", "profile_did_open")
+    ]
+    _MAIN_RX = _token_scanner(p for _, p in MAIN_COMPONENTS)
+    _HELPER_RX = _token_scanner(["CONFIGS = {", '"fast"'])
+    
+    def __init__(self, verbose=False):
         self.passed = 0
         self.failed = 0
+        self.verbose = verbose
+        self._buf = []
         self.addon_dir = Path(__file__).parent
+        # Read __init__.py once and share it between the phases that need it
+        init_file = self.addon_dir / "__init__.py"
+        self._init_bytes = init_file.read_bytes() if init_file.exists() else None
         
+    def emit(self, line=""):
+        """Queue a line of output (printed right away in verbose mode)"""
+        if self.verbose:
+            print(line)
+        else:
+            self._buf.append(f"{line}\n")
+    
+    def flush(self):
+        """Write all queued output in one go"""
+        sys.stdout.write("".join(self._buf))
+        sys.stdout.flush()
+        self._buf.clear()
+    
     def test(self, name, condition, message=""):
         """Run a single test"""
         if condition:
-            print(f"✅ {name}")
+            self.emit(f"✅ {name}")
             self.passed += 1
         else:
-            print(f"❌ {name}: {message}")
+            self.emit(f"❌ {name}: {message}")
             self.failed += 1
     
     def info(self, message):
         """Print info message"""
-        print(f"ℹ️  {message}")
+        self.emit(f"ℹ️  {message}")
     
     def warning(self, message):
         """Print warning message"""
-        print(f"⚠️  {message}")
+        self.emit(f"⚠️  {message}")
     
     def run_all_tests(self):
         """Run all tests"""
-        print("🧪 Anki Review Nudger - Automated Tests\n")
+        self.emit("🧪 Anki Review Nudger - Automated Tests\n")
         
-        self.test_file_structure()
-        self.test_main_code()
-        self.test_configuration()
-        self.test_imports()
-        self.test_helper_files()
+        phases = [
+            self.test_file_structure,
+            self.test_main_code,
+            self.test_configuration,
+            self.test_imports,
+            self.test_helper_files,
+        ]
+        
+        for phase in phases:
+            results = phase()
+            for kind, *args in results:
+                getattr(self, kind)(*args)
         
-        print(f"\n📊 Test Results: {self.passed} passed, {self.failed} failed")
+        self.emit(f"\n📊 Test Results: {self.passed} passed, {self.failed} failed")
         
         if self.failed == 0:
-            print("🎉 All tests passed! Your addon should work correctly.")
-            print("\n🚀 Next steps:")
-            print("   1. Start Anki")
-            print("   2. Run: python test_config.py fast")
-            print("   3. Restart Anki")
-            print("   4. Wait 15 seconds for popup")
+            self.emit("🎉 All tests passed! Your addon should work correctly.")
+            self.emit("\n🚀 Next steps:")
+            self.emit("   1. Start Anki")
+            self.emit("   2. Run: python test_config.py fast")
+            self.emit("   3. Restart Anki")
+            self.emit("   4. Wait 15 seconds for popup")
         else:
-            print("❌ Some tests failed. Check the issues above.")
+            self.emit("❌ Some tests failed. Check the issues above.")
         
+        self.flush()
         return self.failed == 0
     
     def test_file_structure(self):
         """Test that all required files exist"""
-        self.info("Testing file structure...")
+        r = PhaseResults()
+        r.info("Testing file structure...")
         
         required_files = [
             "__init__.py",
             "test_guide.md",
             "test_config.py", 
             "README.md",
-            "run_tests.py"
+            "run_tests.py",
+            "json_compat.py"
         ]
         
+        # One directory listing instead of a stat() per file
+        present = {entry.name for entry in os.scandir(self.addon_dir)}
         for file in required_files:
             file_path = self.addon_dir / file
-            self.test(
+            r.test(
                 f"File exists: {file}",
-                file_path.exists(),
+                file in present,
                 f"Missing file: {file_path}"
             )
+        return r
     
     def test_main_code(self):
         """Test the main addon code"""
-        self.info("Testing main addon code...")
+        r = PhaseResults()
+        r.info("Testing main addon code...")
         
-        init_file = self.addon_dir / "__init__.py"
-        if not init_file.exists():
-            self.test("Main code file", False, "__init__.py not found")
-            return
+        if self._init_bytes is None:
+            r.test("Main code file", False, "__init__.py not found")
+            return r
         
         try:
-            content = init_file.read_text(encoding='utf-8')
+            content = self._init_bytes.decode('utf-8')
             
-            # Check for key components
-            required_components = [
-                ("ReviewNudger class", "class ReviewNudger"),
-                ("Timer setup", "QTimer"),
-                ("Configuration handling", "get_cfg"),
-                ("Menu installation", "_install_menu"),
-                ("Hooks registration", "gui_hooks"),
-                ("Profile initialization", "profile_did_open")
-            ]
-            
-            for name, pattern in required_components:
-                self.test(
+            # Check for key components (single scan over the source)
+            found = _find_all(self._MAIN_RX, content)
+            for name, pattern in self.MAIN_COMPONENTS:
+                r.test(
                     f"Code contains: {name}",
-                    pattern in content,
+                    pattern in found,
                     f"Missing: {pattern}"
                 )
             
             # Check for potential issues
             if "import logging" in content:
-                self.warning("Debug mode detected - remember to use normal version for production")
+                r.warning("Debug mode detected - remember to use normal version for production")
             
         except Exception as e:
-            self.test("Read main code", False, f"Error reading __init__.py: {e}")
+            r.test("Read main code", False, f"Error reading __init__.py: {e}")
+        return r
     
     def test_configuration(self):
         """Test configuration file if it exists"""
-        self.info("Testing configuration...")
+        r = PhaseResults()
+        r.info("Testing configuration...")
         
         config_file = self.addon_dir / "config.json"
         
         if config_file.exists():
             try:
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
+                with open(config_file, 'rb') as f:
+                    config = loads(f.read())
                 
-                self.test("Config file is valid JSON", True)
+                r.test("Config file is valid JSON", True)
                 
                 # Check required keys
                 required_keys = ["interval_minutes", "snooze_minutes", "quiet_hours", "enabled"]
                 for key in required_keys:
-                    self.test(
+                    r.test(
                         f"Config has key: {key}",
                         key in config,
                         f"Missing config key: {key}"
@@ -142,86 +214,90 @@ class TestRunner:
                 # Check value types and ranges
                 if "interval_minutes" in config:
                     interval = config["interval_minutes"]
-                    self.test(
+                    r.test(
                         "Interval is positive number",
                         isinstance(interval, (int, float)) and interval > 0,
                         f"Invalid interval: {interval}"
                     )
                     
                     if interval < 1:
-                        self.info(f"Fast test mode detected: {interval} minutes")
+                        r.info(f"Fast test mode detected: {interval} minutes")
                 
                 if "quiet_hours" in config:
                     quiet = config["quiet_hours"]
-                    self.test(
+                    r.test(
                         "Quiet hours is dict",
                         isinstance(quiet, dict),
                         f"Invalid quiet_hours: {quiet}"
                     )
                     
                     if isinstance(quiet, dict):
-                        self.test(
+                        r.test(
                             "Quiet hours has start/end",
                             "start" in quiet and "end" in quiet,
                             "Missing start/end in quiet_hours"
                         )
                 
-            except json.JSONDecodeError as e:
-                self.test("Config file is valid JSON", False, f"JSON error: {e}")
+            except JSONDecodeError as e:
+                r.test("Config file is valid JSON", False, f"JSON error: {e}")
             except Exception as e:
-                self.test("Read config file", False, f"Error: {e}")
+                r.test("Read config file", False, f"Error: {e}")
         else:
-            self.info("No config.json found (will use defaults)")
+            r.info("No config.json found (will use defaults)")
+        return r
     
     def test_imports(self):
         """Test that required modules can be imported"""
-        self.info("Testing imports...")
+        r = PhaseResults()
+        r.info("Testing imports...")
         
         # Test if we can load the main module
         init_file = self.addon_dir / "__init__.py"
-        if init_file.exists():
+        if self._init_bytes is not None:
             try:
                 spec = importlib.util.spec_from_file_location("addon", init_file)
                 if spec and spec.loader:
-                    # Don't actually import (might cause issues), just check syntax
-                    with open(init_file, 'r', encoding='utf-8') as f:
-                        code = f.read()
-                    
-                    compile(code, str(init_file), 'exec')
-                    self.test("Main code compiles", True)
+                    # Don't actually import (might cause issues), just check syntax;
+                    # parsing is enough, no need to generate bytecode
+                    ast.parse(self._init_bytes, filename=str(init_file))
+                    r.test("Main code parses", True)
                 else:
-                    self.test("Main code can be loaded", False, "Could not create module spec")
+                    r.test("Main code can be loaded", False, "Could not create module spec")
             except SyntaxError as e:
-                self.test("Main code syntax", False, f"Syntax error: {e}")
+                r.test("Main code syntax", False, f"Syntax error: {e}")
             except Exception as e:
-                self.test("Main code compilation", False, f"Compilation error: {e}")
+                r.test("Main code compilation", False, f"Compilation error: {e}")
+        return r
     
     def test_helper_files(self):
         """Test helper files"""
-        self.info("Testing helper files...")
+        r = PhaseResults()
+        r.info("Testing helper files...")
         
         # Test test_config.py
         test_config = self.addon_dir / "test_config.py"
         if test_config.exists():
             try:
                 content = test_config.read_text(encoding='utf-8')
-                self.test(
+                found = _find_all(self._HELPER_RX, content)
+                r.test(
                     "Test config script has CONFIGS",
-                    "CONFIGS = {" in content,
+                    "CONFIGS = {" in found,
                     "Missing CONFIGS dictionary"
                 )
                 
-                self.test(
+                r.test(
                     "Test config has fast mode",
-                    '"fast"' in content,
+                    '"fast"' in found,
                     "Missing fast test mode"
                 )
             except Exception as e:
-                self.test("Read test config", False, f"Error: {e}")
+                r.test("Read test config", False, f"Error: {e}")
+        return r
 
 def main():
     """Main entry point"""
-    runner = TestRunner()
+    runner = TestRunner(verbose="-v" in sys.argv[1:])
     success = runner.run_all_tests()
     sys.exit(0 if success else 1)
 
@@ -17,10 +17,13 @@ Test modes:
 - disabled: Test disabled state
 """
 
-import json
+import mmap
 import os
 import sys
 from pathlib import Path
+from types import MappingProxyType
+
+from json_compat import dumps, dumps_bytes, loads
 
 # Configuration templates
 CONFIGS = {
@@ -49,6 +52,28 @@ CONFIGS = {
         "enabled": False
     }
 }
+# Serialize each template once at import time
+_SERIALIZED = {mode: dumps_bytes(cfg) for mode, cfg in CONFIGS.items()}
+_PRETTY = {mode: data.decode("utf-8") for mode, data in _SERIALIZED.items()}
+
+def _freeze(value):
+    """Recursively wrap dicts in read-only proxies"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    return value
+
+# Read-only all the way down so the serialized copies above can't go stale
+CONFIGS = _freeze(CONFIGS)
+
+# Our __init__.py is well under this; anything larger is another addon
+MAX_INIT_SIZE = 64 * 1024
+
+def _is_our_addon(init_file, size):
+    """Check the addon signature without decoding the whole file"""
+    if size >= MAX_INIT_SIZE:
+        return False
+    with open(init_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm.find(b"ReviewNudger") != -1 and mm.find(b"forced_review") != -1
 
 def find_addon_config_path():
     """Find the addon configuration file path"""
@@ -62,18 +87,24 @@ def find_addon_config_path():
     for base_path in possible_paths:
         if base_path.exists():
             # Look for our addon folder
-            for addon_dir in base_path.iterdir():
-                if addon_dir.is_dir():
+            # (scandir's DirEntry.is_dir() avoids an extra stat per entry)
+            with os.scandir(base_path) as it:
+                for entry in it:
+                    if not entry.is_dir():
+                        continue
+                    addon_dir = Path(entry.path)
                     init_file = addon_dir / "__init__.py"
-                    if init_file.exists():
-                        # Check if this is our addon by looking for our code
-                        try:
-                            content = init_file.read_text(encoding='utf-8')
-                            if "ReviewNudger" in content and "forced_review" in content:
-                                config_file = addon_dir / "config.json"
-                                return config_file
-                        except Exception:
-                            continue
+                    try:
+                        st = os.stat(init_file)
+                    except OSError:
+                        continue
+                    # Check if this is our addon by looking for our code
+                    try:
+                        if _is_our_addon(init_file, st.st_size):
+                            config_file = addon_dir / "config.json"
+                            return config_file
+                    except Exception:
+                        continue
     return None
 
 def set_config(mode):
@@ -91,12 +122,11 @@ def set_config(mode):
     
     try:
         # Write the new configuration
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(CONFIGS[mode], f, indent=2)
+        Path(config_path).write_bytes(_SERIALIZED[mode])
         
         print(f"✅ Configuration set to '{mode}' mode")
         print(f"📁 Config file: {config_path}")
-        print(f"⚙️  Settings: {json.dumps(CONFIGS[mode], indent=2)}")
+        print(f"⚙️  Settings: {_PRETTY[mode]}")
         print("\n🔄 Please restart Anki for changes to take effect.")
         
         if mode == "fast":
@@ -125,12 +155,12 @@ def show_current_config():
         return
     
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        with open(config_path, 'rb') as f:
+            config = loads(f.read())
         
         print(f"📁 Config file: {config_path}")
         print(f"⚙️  Current settings:")
-        print(json.dumps(config, indent=2))
+        print(dumps(config))
         
     except Exception as e:
         print(f"❌ Error reading configuration: {e}")